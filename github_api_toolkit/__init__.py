@@ -2,8 +2,109 @@ import jwt
 import time
 import requests
 import re
+from typing import Iterator
 
-def get_token_as_installation(org: str, pem_contents: str, app_client_id: str) -> tuple | Exception:
+from github_api_toolkit.limiter import adaptive_limiter
+
+# Default (connect, read) timeout in seconds applied to every request made by the toolkit.
+DEFAULT_TIMEOUT = (10, 30)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised or returned when the time budget for a multi-request call has been spent.
+
+    Attributes:
+        partial (list): Any results gathered before the deadline was reached.
+    """
+
+    def __init__(self, *args, partial: list | None = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.partial = partial if partial is not None else []
+
+
+def get_remaining_timeout(timeout: float | tuple, deadline: float | None) -> float | tuple:
+    """Caps a request timeout so that it does not run past a deadline.
+
+    Args:
+        timeout (float | tuple): The timeout in seconds, either a single value or a (connect, read) tuple.
+        deadline (float | None): The deadline as a time.monotonic() value, or None if there is no deadline.
+
+    Returns:
+        float | tuple: The timeout to use for the next request.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed.
+    """
+
+    if deadline is None:
+        return timeout
+
+    remaining = deadline - time.monotonic()
+
+    if remaining <= 0:
+        raise DeadlineExceeded("The deadline was reached before the request could be made.")
+
+    if isinstance(timeout, tuple):
+        return tuple(min(value, remaining) for value in timeout)
+
+    return min(timeout, remaining)
+
+
+def send_request(method, limiter: adaptive_limiter | None = None, timeout: float | tuple = DEFAULT_TIMEOUT, deadline: float | None = None, **kwargs) -> requests.Response:
+    """Makes a request, going through a limiter if one is given.
+
+    The timeout is worked out after waiting for the limiter, so time spent waiting counts against the deadline.
+    A timeout caused by the deadline running out is not counted by the limiter as an API error.
+
+    Args:
+        method: The requests function to call, such as requests.get.
+        limiter (adaptive_limiter | None, optional): The limiter to make the request through. Defaults to None.
+        timeout (float | tuple, optional): The timeout in seconds, either a single value or a (connect, read) tuple. Defaults to DEFAULT_TIMEOUT.
+        deadline (float | None, optional): The deadline as a time.monotonic() value, or None if there is no deadline. Defaults to None.
+        **kwargs: The keyword arguments to pass to method.
+
+    Returns:
+        requests.Response: The response from the API endpoint.
+
+    Raises:
+        DeadlineExceeded: If the deadline passes before the limiter allows the request to be made.
+    """
+
+    if limiter is None:
+        return method(timeout=get_remaining_timeout(timeout, deadline), **kwargs)
+
+    start_time = limiter.acquire(deadline)
+
+    if start_time is None:
+        raise DeadlineExceeded("The deadline was reached while waiting for the limiter.")
+
+    try:
+        request_timeout = get_remaining_timeout(timeout, deadline)
+    except DeadlineExceeded:
+        limiter.cancel()
+        raise
+
+    response = None
+
+    try:
+        response = method(timeout=request_timeout, **kwargs)
+    except requests.exceptions.Timeout:
+        if deadline is not None and time.monotonic() >= deadline:
+            # The timeout was cut short by the deadline, so it says nothing about the health of the API
+            limiter.cancel()
+        else:
+            limiter.release(start_time, response)
+        raise
+    except BaseException:
+        limiter.release(start_time, response)
+        raise
+
+    limiter.release(start_time, response)
+
+    return response
+
+
+def get_token_as_installation(org: str, pem_contents: str, app_client_id: str, timeout: float | tuple = DEFAULT_TIMEOUT, deadline: float | None = None) -> tuple | Exception:
     """Get an access token for a GitHub App installed in an organization.
 
     Generates an encoded JSON Web Token (JWT) using the GitHub app client ID and the private key (pem_contents).
@@ -15,6 +116,8 @@ def get_token_as_installation(org: str, pem_contents: str, app_client_id: str) -
         org (str): The GitHub organization name which the GitHub App is installed in.
         pem_contents (str): The contents of the private key file for the GitHub App.
         app_client_id (str): The GitHub App Client ID.
+        timeout (float | tuple, optional): The timeout in seconds for each request, either a single value or a (connect, read) tuple. Defaults to DEFAULT_TIMEOUT.
+        deadline (float | None, optional): The total time in seconds allowed for both requests. Defaults to None (no deadline).
 
     Returns:
         A tuple containing the access token and the expiration time.
@@ -44,9 +147,12 @@ def get_token_as_installation(org: str, pem_contents: str, app_client_id: str) -
 
     # Get Installation ID
     header = {"Authorization": f"Bearer {encoded_jwt}"}
+
+    if deadline is not None:
+        deadline = time.monotonic() + deadline
     
     try:
-        response = requests.get(url=f"https://api.github.com/orgs/{org}/installation", headers=header)
+        response = requests.get(url=f"https://api.github.com/orgs/{org}/installation", headers=header, timeout=get_remaining_timeout(timeout, deadline))
 
         response.raise_for_status()
 
@@ -54,7 +160,7 @@ def get_token_as_installation(org: str, pem_contents: str, app_client_id: str) -
         installation_id = installation_json["id"]
 
         # Get Access Token
-        response = requests.post(url=f"https://api.github.com/app/installations/{installation_id}/access_tokens", headers=header)
+        response = requests.post(url=f"https://api.github.com/app/installations/{installation_id}/access_tokens", headers=header, timeout=get_remaining_timeout(timeout, deadline))
         access_token = response.json()
         return (access_token["token"], access_token["expires_at"])
     
@@ -74,10 +180,17 @@ class github_interface():
     The class can perform authenticated get, patch and post requests to the GitHub API using the requests library.
     """
 
-    def __init__(self, token: str) -> None:
+    def __init__(self, token: str, timeout: float | tuple = DEFAULT_TIMEOUT, limiter: adaptive_limiter | None = None) -> None:
         """Creates the header attribute containing the Personal Access token to make auth'd API requests.
+
+        Args:
+            token (str): The GitHub access token.
+            timeout (float | tuple, optional): The timeout in seconds for each request, either a single value or a (connect, read) tuple. Defaults to DEFAULT_TIMEOUT.
+            limiter (adaptive_limiter | None, optional): A limiter, shared between threads, to control how many requests are made at once. Defaults to None.
         """
         self.headers = {"Authorization": "token " + token}
+        self.timeout = timeout
+        self.limiter = limiter
 
 
     def handle_response(self, response: requests.Response) -> requests.Response | Exception:
@@ -119,7 +232,10 @@ class github_interface():
         """
         if add_prefix:
             url = "https://api.github.com" + url
-        return self.handle_response(requests.get(url=url, headers=self.headers, params=params))
+        try:
+            return self.handle_response(send_request(requests.get, self.limiter, url=url, headers=self.headers, params=params, timeout=self.timeout))
+        except requests.exceptions.Timeout as errt:
+            return(errt)
     
     def patch(self, url: str, params: dict = {}, add_prefix: bool = True) -> requests.Response | Exception:
         """Performs a patch request using the passed url.
@@ -136,7 +252,10 @@ class github_interface():
         """
         if add_prefix:
             url = "https://api.github.com" + url
-        return self.handle_response(requests.patch(url=url, headers=self.headers, json=params))
+        try:
+            return self.handle_response(send_request(requests.patch, self.limiter, url=url, headers=self.headers, json=params, timeout=self.timeout))
+        except requests.exceptions.Timeout as errt:
+            return(errt)
     
     def post(self, url: str, params: dict = {}, add_prefix: bool = True) -> requests.Response | Exception:
         """Performs a post request using the passed url.
@@ -153,15 +272,26 @@ class github_interface():
         """
         if add_prefix:
             url = "https://api.github.com" + url
-        return self.handle_response(requests.post(url=url, headers=self.headers, json=params))
+        try:
+            return self.handle_response(send_request(requests.post, self.limiter, url=url, headers=self.headers, json=params, timeout=self.timeout))
+        except requests.exceptions.Timeout as errt:
+            return(errt)
 
 class github_graphql_interface():
     """A class used to interact with the GitHub GraphQL API. Has a set range of functions.
     """
     
-    def __init__(self, token: str) -> None:
+    def __init__(self, token: str, timeout: float | tuple = DEFAULT_TIMEOUT, limiter: adaptive_limiter | None = None) -> None:
         self.headers = { "Authorization": "token " + token }
         self.api_url = "https://api.github.com/graphql"
+        self.timeout = timeout
+
+        # An optional adaptive_limiter, shared between threads, to control how many requests are made at once
+        self.limiter = limiter
+
+        # Set by get_repository_email_list() while a deadline is in effect.
+        # Holds a time.monotonic() value which make_ql_request() uses to cap each request's timeout.
+        self.deadline = None
 
     def get_error_message(self, response: requests.Response) -> tuple:
         """Gets the error message and status code from a response.
@@ -185,6 +315,10 @@ class github_graphql_interface():
 
         Returns:
             requests.Response: The response from the API endpoint.
+
+        Raises:
+            requests.exceptions.Timeout: If the request takes longer than the timeout.
+            DeadlineExceeded: If a deadline is in effect and passes before or during the request.
         """
 
         self.json = {
@@ -192,7 +326,14 @@ class github_graphql_interface():
             'variables': params
         }
 
-        return requests.post(url=self.api_url, json=self.json, headers=self.headers)
+        try:
+            return send_request(requests.post, self.limiter, timeout=self.timeout, deadline=self.deadline, url=self.api_url, json=self.json, headers=self.headers)
+        except DeadlineExceeded:
+            raise
+        except requests.exceptions.Timeout as errt:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                raise DeadlineExceeded(f"The deadline was reached during the request: {errt}") from errt
+            raise
 
     def get_domain_email_by_user(self, username: str, org: str) -> list | tuple:
         """Gets a GitHub user's verified domain email for a specific organization.
@@ -203,6 +344,10 @@ class github_graphql_interface():
 
         Returns:
             list | tuple: A list of verified domain emails for the user in the organization or a tuple containing an error message and status code.
+
+        Raises:
+            requests.exceptions.Timeout: If a request takes longer than the timeout.
+            DeadlineExceeded: If a deadline is in effect and has passed.
         """
         
         self.query = '''
@@ -242,6 +387,10 @@ class github_graphql_interface():
 
         Returns:
             str: The contents of the file.
+
+        Raises:
+            requests.exceptions.Timeout: If a request takes longer than the timeout.
+            DeadlineExceeded: If a deadline is in effect and has passed.
         """
 
         self.query = f'''
@@ -284,6 +433,10 @@ class github_graphql_interface():
 
         Returns:
             str | None: The path to the file is found or None if the file is not found.
+
+        Raises:
+            requests.exceptions.Timeout: If a request takes longer than the timeout.
+            DeadlineExceeded: If a deadline is in effect and has passed.
         """
 
         response = self.get_file_contents_from_repo(owner, repo, path, branch)
@@ -306,6 +459,10 @@ class github_graphql_interface():
 
         Returns:
             str | None: The path to the CODEOWNERS file or None if the file is not found.
+
+        Raises:
+            requests.exceptions.Timeout: If a request takes longer than the timeout.
+            DeadlineExceeded: If a deadline is in effect and has passed.
         """
 
         # Check root directory
@@ -439,6 +596,10 @@ class github_graphql_interface():
 
         Returns:
             list | tuple: A list of maintainers in the team or a tuple containing an error message and status code.
+
+        Raises:
+            requests.exceptions.Timeout: If a request takes longer than the timeout.
+            DeadlineExceeded: If a deadline is in effect and has passed.
         """
 
         self.query = '''
@@ -482,6 +643,10 @@ class github_graphql_interface():
 
         Returns:
             list: A list of users from the CODEOWNERS file.
+
+        Raises:
+            requests.exceptions.Timeout: If a request takes longer than the timeout.
+            DeadlineExceeded: If a deadline is in effect and has passed.
         """
 
         users = []
@@ -489,7 +654,7 @@ class github_graphql_interface():
         for codeowner in codeowners:
             if codeowner["type"] == "team":
                 team_maintainers = self.get_team_maintainers(org, codeowner["name"])
-                
+
                 for maintainer in team_maintainers:
                     users.append(maintainer["login"])
 
@@ -510,40 +675,158 @@ class github_graphql_interface():
 
         Returns:
             list: A list of verified domain emails for the users.
+
+        Raises:
+            requests.exceptions.Timeout: If a request takes longer than the timeout.
+            DeadlineExceeded: If a deadline is in effect and has passed.
         """
         
         emails = []
 
         for codeowner in codeowners:
-            user_emails = self.get_domain_email_by_user(codeowner, org)
+            try:
+                user_emails = self.get_domain_email_by_user(codeowner, org)
+            except DeadlineExceeded as err:
+                err.partial = emails
+                raise
 
             for email in user_emails:
                 emails.append(email)
 
         return emails
     
-    def get_repository_email_list(self, org: str, repo: str, branch: str = "main") -> list:
+    def iter_codeowner_records(self, org: str, codeowners: list) -> Iterator[dict]:
+        """Yields the verified domain emails of each user in a list of users and teams as soon as they are found.
+
+        This is a lazy form of get_codeowner_users() followed by get_codeowner_emails().
+        Each user is only looked up once, even if they appear more than once or are a maintainer of more than one team.
+        Nothing is requested until the next record is asked for, so the caller can stop early.
+
+        Args:
+            org (str): The GitHub organization name.
+            codeowners (list): A list of users and teams from identify_teams_and_users().
+                Each dictionary can also have a handle key with the codeowner as written in the CODEOWNERS file.
+
+        Yields:
+            dict: A dictionary containing the handle and type of the codeowner, the user's login and their emails.
+            The handle is as written in the CODEOWNERS file (i.e. @org/team-name) if given, otherwise the name.
+            If a user's emails cannot be found, emails is an empty list.
+
+        Raises:
+            requests.exceptions.Timeout: If a request takes longer than the timeout.
+            DeadlineExceeded: If a deadline is in effect and has passed.
+        """
+
+        seen = set()
+
+        for codeowner in codeowners:
+            if codeowner["type"] == "team":
+                team_maintainers = self.get_team_maintainers(org, codeowner["name"])
+
+                if not isinstance(team_maintainers, list):
+                    # An error message and status code was returned
+                    continue
+
+                logins = [maintainer["login"] for maintainer in team_maintainers]
+
+            elif codeowner["type"] == "user":
+                logins = [codeowner["name"]]
+
+            for login in logins:
+                if login in seen:
+                    continue
+
+                seen.add(login)
+
+                user_emails = self.get_domain_email_by_user(login, org)
+
+                yield {
+                    "handle": codeowner.get("handle", codeowner["name"]),
+                    "type": codeowner["type"],
+                    "login": login,
+                    "emails": user_emails if isinstance(user_emails, list) else []
+                }
+
+    def iter_repository_email_list(self, org: str, repo: str, branch: str = "main") -> Iterator[dict]:
+        """Yields the verified domain emails for each codeowner of a repository as soon as they are found.
+
+        This is a lazy form of get_repository_email_list(). See iter_codeowner_records() for the records yielded.
+
+        Args:
+            org (str): The GitHub organization name.
+            repo (str): The GitHub repository name.
+            branch (str, optional): The branch to check. Defaults to "main".
+
+        Yields:
+            dict: A dictionary containing the handle and type of the codeowner, the user's login and their emails.
+
+        Raises:
+            requests.exceptions.Timeout: If a request takes longer than the timeout.
+            DeadlineExceeded: If a deadline is in effect and has passed.
+        """
+
+        codeowners_path = self.locate_codeowners_file(org, repo, branch)
+
+        if codeowners_path is None:
+            return
+
+        contents = self.get_file_contents_from_repo(org, repo, codeowners_path, branch)
+
+        if not isinstance(contents, str):
+            return
+
+        handles = self.get_codeowners_from_text(contents)
+
+        # identify_teams_and_users() strips the handles in place, so pass a copy and keep the originals
+        codeowners = self.identify_teams_and_users(list(handles))
+
+        for codeowner, handle in zip(codeowners, handles):
+            codeowner["handle"] = handle
+
+        yield from self.iter_codeowner_records(org, codeowners)
+
+    def get_repository_email_list(self, org: str, repo: str, branch: str = "main", deadline: float | None = None) -> list | requests.exceptions.Timeout:
         """Gets a list of verified domain emails for the codeowners of a repository.
 
+        If a request takes longer than the timeout, the requests.exceptions.Timeout object is returned rather than raised.
+
+        If a deadline is given, each request is limited to the time remaining in the budget.
+        Once the budget is spent, no further requests are made and a DeadlineExceeded object is returned.
+        Its partial attribute contains any emails gathered before the deadline was reached.
+
         Args:
             org (str): The GitHub organization name.
             repo (str): The GitHub repository name.
             branch (str, optional): The branch to check. Defaults to "main".
+            deadline (float | None, optional): The total time in seconds allowed for the whole lookup. Defaults to None (no deadline).
 
         Returns:
-            list: A list of verified domain emails for the codeowners of the repository.
+            list | requests.exceptions.Timeout: A list of verified domain emails for the codeowners of the repository.
+            If a request times out, a Timeout object is returned to be handled by the importing program.
+            If the deadline is reached, this is a DeadlineExceeded object containing partial results.
         """
 
-        codeowners_path = self.locate_codeowners_file(org, repo, branch)
+        if deadline is not None:
+            self.deadline = time.monotonic() + deadline
 
-        contents = self.get_file_contents_from_repo(org, repo, codeowners_path)
+        try:
+            codeowners_path = self.locate_codeowners_file(org, repo, branch)
 
-        codeowners = self.get_codeowners_from_text(contents)
+            contents = self.get_file_contents_from_repo(org, repo, codeowners_path, branch)
 
-        codeowners = self.identify_teams_and_users(codeowners)
+            codeowners = self.get_codeowners_from_text(contents)
 
-        codeowners = self.get_codeowner_users(org, codeowners)
+            codeowners = self.identify_teams_and_users(codeowners)
 
-        emails = self.get_codeowner_emails(codeowners, org)
+            # If the deadline is reached here, no emails have been gathered so partial is left empty
+            codeowners = self.get_codeowner_users(org, codeowners)
+
+            emails = self.get_codeowner_emails(codeowners, org)
+
+        except requests.exceptions.Timeout as errt:
+            # Includes DeadlineExceeded
+            return errt
+        finally:
+            self.deadline = None
 
         return emails
@@ -0,0 +1,365 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import github_api_toolkit
+
+
+def get_org_repositories(gh: github_api_toolkit.github_interface, org: str) -> list | Exception:
+    """Gets the names of every repository in a GitHub organization.
+
+    Args:
+        gh (github_interface): An instance of the github_interface class.
+        org (str): The GitHub organization name.
+
+    Returns:
+        list | Exception: A list of repository names or an Exception object if a request fails.
+    """
+
+    repos = []
+    page = 1
+
+    while True:
+        response = gh.get(f"/orgs/{org}/repos", params={"per_page": 100, "page": page})
+
+        if isinstance(response, Exception):
+            return response
+
+        page_repos = response.json()
+
+        if len(page_repos) == 0:
+            break
+
+        for repo in page_repos:
+            repos.append(repo["name"])
+
+        page += 1
+
+    return repos
+
+
+def read_repository_file(path: str) -> list:
+    """Reads a list of repository names from a file.
+
+    The file should contain one repository name per line. Empty lines and lines starting with # are ignored.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        list: A list of repository names.
+    """
+
+    repos = []
+
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+
+            if line == "" or line[0] == "#":
+                continue
+
+            repos.append(line)
+
+    return repos
+
+
+def read_checkpoint(path: str) -> set:
+    """Reads the names of repositories which have already been processed without error from a checkpoint file.
+
+    Args:
+        path (str): The path to the checkpoint file.
+
+    Returns:
+        set: The names of the repositories in the checkpoint file. Empty if the file does not exist.
+    """
+
+    if not os.path.exists(path):
+        return set()
+
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip() != ""}
+
+
+def describe_lookup_error(result: tuple | str | None) -> str:
+    """Describes a failed lookup returned by github_graphql_interface.
+
+    Args:
+        result (tuple | str | None): The value returned instead of a list, such as an (error type, message) or (message, status code) tuple.
+
+    Returns:
+        str: A description of the error.
+    """
+
+    if isinstance(result, tuple):
+        return " ".join(str(part) for part in result)
+
+    return str(result)
+
+
+def get_repository_emails(ql: github_api_toolkit.github_graphql_interface, org: str, repo: str, branch: str, emails: list, errors: list) -> None:
+    """Looks up the verified domain emails of a repository's codeowners, checking the result of every lookup.
+
+    A team or user which could not be looked up is added to errors rather than being left out silently.
+    The remaining lookups still go ahead. Emails are added to the passed list as they are found, so any
+    gathered before a timeout are kept.
+
+    Args:
+        ql (github_graphql_interface): The interface to make the requests with.
+        org (str): The GitHub organization name.
+        repo (str): The GitHub repository name.
+        branch (str): The branch to check.
+        emails (list): The list to add emails to.
+        errors (list): The list to add a description of each failed lookup to.
+
+    Raises:
+        requests.exceptions.Timeout: If a request takes longer than the timeout.
+        DeadlineExceeded: If a deadline is in effect and has passed.
+    """
+
+    codeowners_path = ql.locate_codeowners_file(org, repo, branch)
+
+    if codeowners_path is None:
+        return
+
+    contents = ql.get_file_contents_from_repo(org, repo, codeowners_path, branch)
+
+    if not isinstance(contents, str):
+        errors.append(f"{codeowners_path}: {describe_lookup_error(contents)}")
+        return
+
+    codeowners = ql.identify_teams_and_users(ql.get_codeowners_from_text(contents))
+
+    users = []
+
+    for codeowner in codeowners:
+        if codeowner["type"] == "team":
+            team_maintainers = ql.get_team_maintainers(org, codeowner["name"])
+
+            if not isinstance(team_maintainers, list):
+                errors.append(f"team {codeowner['name']}: {describe_lookup_error(team_maintainers)}")
+                continue
+
+            users.extend(maintainer["login"] for maintainer in team_maintainers)
+
+        elif codeowner["type"] == "user":
+            users.append(codeowner["name"])
+
+    # Remove duplicates
+    for user in dict.fromkeys(users):
+        user_emails = ql.get_domain_email_by_user(user, org)
+
+        if not isinstance(user_emails, list):
+            errors.append(f"user {user}: {describe_lookup_error(user_emails)}")
+            continue
+
+        emails.extend(user_emails)
+
+
+def sweep_repository(token: str, org: str, repo: str, branch: str, timeout: float, deadline: float | None, limiter: github_api_toolkit.adaptive_limiter | None = None) -> dict:
+    """Runs the CODEOWNERS to emails pipeline for a single repository.
+
+    A new github_graphql_interface is made for each repository as the class is not safe to share between threads.
+
+    Args:
+        token (str): The GitHub access token.
+        org (str): The GitHub organization name.
+        repo (str): The GitHub repository name.
+        branch (str): The branch to check.
+        timeout (float): The timeout in seconds for each request.
+        deadline (float | None): The total time in seconds allowed for the repository, or None for no deadline.
+        limiter (adaptive_limiter | None, optional): A limiter shared by every repository. Defaults to None.
+
+    Returns:
+        dict: A record containing the repository name, emails, time taken and any error.
+        If any lookup failed, error describes each failure and emails contains those which were found.
+    """
+
+    start_time = time.monotonic()
+
+    record = {
+        "repo": repo,
+        "emails": [],
+        "error": None
+    }
+
+    ql = github_api_toolkit.github_graphql_interface(token, timeout=timeout, limiter=limiter)
+
+    if deadline is not None:
+        ql.deadline = start_time + deadline
+
+    errors = []
+
+    try:
+        get_repository_emails(ql, org, repo, branch, record["emails"], errors)
+    except Exception as err:
+        # Includes Timeout and DeadlineExceeded
+        errors.append(f"{type(err).__name__}: {err}")
+    finally:
+        ql.deadline = None
+
+    if errors:
+        record["error"] = "; ".join(errors)
+
+    record["elapsed"] = round(time.monotonic() - start_time, 3)
+
+    return record
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Creates the argument parser for the command line tool.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="github-codeowners-sweep",
+        description="Gets the verified domain emails of the CODEOWNERS for every repository in a GitHub organization. One JSON line is written per repository as soon as it finishes."
+    )
+
+    parser.add_argument("org", help="The GitHub organization name.")
+    parser.add_argument("--repo-file", help="A file containing one repository name per line. If not given, every repository in the organization is swept.")
+    parser.add_argument("--token", default=os.getenv("GITHUB_TOKEN"), help="A GitHub access token. Defaults to the GITHUB_TOKEN environment variable.")
+    parser.add_argument("--pem-file", help="The private key file of a GitHub App. Used with --app-client-id instead of --token.")
+    parser.add_argument("--app-client-id", help="The GitHub App Client ID. Used with --pem-file instead of --token.")
+    parser.add_argument("--branch", default="main", help="The branch to read CODEOWNERS from. Defaults to main.")
+    parser.add_argument("--concurrency", type=int, default=4, help="The number of repositories to process at once. Defaults to 4.")
+    parser.add_argument("--adaptive", action="store_true", help="Adjust the number of requests in flight to how the API is responding, up to --concurrency.")
+    parser.add_argument("--timeout", type=float, default=30, help="The timeout in seconds for each request. Defaults to 30.")
+    parser.add_argument("--deadline", type=float, help="The total time in seconds allowed per repository. Defaults to no deadline.")
+    parser.add_argument("--output", help="The file to write JSON lines to. Output is appended to the file. Defaults to stdout.")
+    parser.add_argument("--checkpoint", help="A file recording repositories which finished without error. Repositories in this file are skipped, allowing an interrupted sweep to be resumed. Failed repositories are retried.")
+
+    return parser
+
+
+def main(argv: list | None = None) -> int:
+    """The entry point for the github-codeowners-sweep command.
+
+    Args:
+        argv (list | None, optional): The command line arguments. Defaults to None (use sys.argv).
+
+    Returns:
+        int: The exit code. 0 if every repository was processed without error, 1 if any failed and 2 for usage errors.
+    """
+
+    args = get_parser().parse_args(argv)
+
+    if args.concurrency < 1:
+        print("--concurrency must be at least 1.", file=sys.stderr)
+        return 2
+
+    # Get an access token
+    if args.pem_file and args.app_client_id:
+        with open(args.pem_file) as f:
+            pem_contents = f.read()
+
+        token = github_api_toolkit.get_token_as_installation(args.org, pem_contents, args.app_client_id, timeout=args.timeout)
+
+        if isinstance(token, Exception):
+            print(f"Failed to get an access token: {token}", file=sys.stderr)
+            return 2
+
+        token = token[0]
+    elif args.token:
+        token = args.token
+    else:
+        print("A token is required. Use --token, GITHUB_TOKEN or --pem-file with --app-client-id.", file=sys.stderr)
+        return 2
+
+    limiter = None
+
+    if args.adaptive:
+        limiter = github_api_toolkit.adaptive_limiter(initial_limit=min(4, args.concurrency), max_limit=args.concurrency)
+
+    # Get the list of repositories to sweep
+    if args.repo_file:
+        repos = read_repository_file(args.repo_file)
+    else:
+        repos = get_org_repositories(github_api_toolkit.github_interface(token, timeout=args.timeout, limiter=limiter), args.org)
+
+        if isinstance(repos, Exception):
+            print(f"Failed to list repositories: {repos}", file=sys.stderr)
+            return 2
+
+    # Skip any repositories already recorded in the checkpoint
+    skipped = 0
+
+    if args.checkpoint:
+        finished = read_checkpoint(args.checkpoint)
+        skipped = len([repo for repo in repos if repo in finished])
+        repos = [repo for repo in repos if repo not in finished]
+
+    output = open(args.output, "a") if args.output else sys.stdout
+    checkpoint = open(args.checkpoint, "a") if args.checkpoint else None
+
+    start_time = time.monotonic()
+    repo_times = []
+    failed = 0
+    interrupted = False
+
+    executor = ThreadPoolExecutor(max_workers=args.concurrency)
+
+    try:
+        futures = [
+            executor.submit(sweep_repository, token, args.org, repo, args.branch, args.timeout, args.deadline, limiter)
+            for repo in repos
+        ]
+
+        for future in as_completed(futures):
+            record = future.result()
+
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+            # Only record a repository once its result has been written
+            # Repositories with errors are left out so that they are retried when the sweep is resumed
+            if checkpoint and not record["error"]:
+                checkpoint.write(record["repo"] + "\n")
+                checkpoint.flush()
+
+            repo_times.append(record["elapsed"])
+
+            if record["error"]:
+                failed += 1
+
+    except KeyboardInterrupt:
+        interrupted = True
+    finally:
+        executor.shutdown(wait=not interrupted, cancel_futures=True)
+
+        if output is not sys.stdout:
+            output.close()
+        if checkpoint:
+            checkpoint.close()
+
+    # Print a summary
+    elapsed = time.monotonic() - start_time
+    processed = len(repo_times)
+
+    print(f"Processed {processed} of {len(repos)} repositories ({failed} with errors, {skipped} skipped from checkpoint) in {elapsed:.2f}s.", file=sys.stderr)
+
+    if processed > 0:
+        repo_times.sort()
+        p95 = repo_times[min(processed - 1, int(processed * 0.95))]
+
+        print(f"Throughput: {processed / elapsed:.2f} repositories/s. Per repository: mean {sum(repo_times) / processed:.2f}s, p95 {p95:.2f}s, max {repo_times[-1]:.2f}s.", file=sys.stderr)
+
+    if limiter:
+        metrics = limiter.metrics()
+
+        print(f"Adaptive limit: {metrics['limit']} requests in flight ({metrics['successes']} healthy, {metrics['throttled']} throttled, {metrics['errors']} errors, {metrics['latency_spikes']} latency spikes).", file=sys.stderr)
+
+    if interrupted:
+        print("Interrupted. Run again with the same --checkpoint to resume.", file=sys.stderr)
+        return 130
+
+    return 1 if failed > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+import threading
+import time
+
+import requests
+
+
+class adaptive_limiter():
+    """Limits the number of requests in flight at once, adjusting the limit to how the API is responding.
+
+    Uses additive increase, multiplicative decrease (AIMD):
+    - Each healthy response raises the limit by 1 / limit, so the limit grows by about 1 for each full round of requests.
+    - A throttled response, server error, failed request or latency spike multiplies the limit by decrease_factor.
+    - A Retry-After header, an exhausted primary rate limit or a GraphQL RATE_LIMITED error pauses all new requests until the given time.
+    - Latency spikes are measured against a moving average of every completed response, so the limiter adapts when normal latency changes.
+
+    A single instance should be shared by every thread making requests. Pass it to github_interface or
+    github_graphql_interface using the limiter argument.
+    """
+
+    def __init__(self, initial_limit: float = 4, min_limit: float = 1, max_limit: float = 32, decrease_factor: float = 0.5, latency_tolerance: float = 2.0) -> None:
+        """Creates a limiter.
+
+        Args:
+            initial_limit (float, optional): The starting number of concurrent requests. Defaults to 4.
+            min_limit (float, optional): The lowest the limit can fall to. Defaults to 1.
+            max_limit (float, optional): The highest the limit can grow to. Defaults to 32.
+            decrease_factor (float, optional): The multiplier applied to the limit when backing off. Defaults to 0.5.
+            latency_tolerance (float, optional): How many times slower than the average latency a response must be to count as a spike. Defaults to 2.0.
+        """
+
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.blocked_until = 0.0
+
+        # Requests which started before the last decrease don't trigger another one,
+        # so a burst of failures from the same round only backs off once
+        self.last_decrease = 0.0
+
+        # Exponentially weighted moving average of the response times of every completed request
+        self.latency_average = None
+        self.latency_samples = 0
+
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+        self.latency_spikes = 0
+
+    def acquire(self, deadline: float | None = None) -> float | None:
+        """Waits until a request can be made and marks it as in flight.
+
+        Args:
+            deadline (float | None, optional): The latest time, as a time.monotonic() value, to wait until. Defaults to None (wait as long as needed).
+
+        Returns:
+            float | None: The start time of the request, to be passed to release(), or None if no request could be made before the deadline.
+        """
+
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                remaining = None if deadline is None else deadline - now
+
+                if remaining is not None and remaining <= 0:
+                    return None
+
+                wait = self.blocked_until - now
+
+                if wait > 0:
+                    self.condition.wait(wait if remaining is None else min(wait, remaining))
+                elif self.in_flight >= max(1, int(self.limit)):
+                    self.condition.wait(remaining)
+                else:
+                    break
+
+            self.in_flight += 1
+
+            return time.monotonic()
+
+    def cancel(self) -> None:
+        """Gives back a slot from acquire() without a request having been made. The limit is not changed."""
+
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def release(self, start_time: float, response: requests.Response | None = None) -> None:
+        """Marks a request as finished and adjusts the limit based on its outcome.
+
+        Args:
+            start_time (float): The value returned by acquire().
+            response (requests.Response | None, optional): The response, or None if the request failed. Defaults to None.
+        """
+
+        latency = time.monotonic() - start_time
+
+        with self.condition:
+            self.in_flight -= 1
+
+            if response is None or response.status_code >= 500:
+                self.errors += 1
+                self.decrease(start_time)
+
+            elif self.is_throttled(response):
+                self.throttled += 1
+                self.decrease(start_time)
+
+            else:
+                if self.latency_samples >= 10 and latency > self.latency_average * self.latency_tolerance:
+                    self.latency_spikes += 1
+                    self.decrease(start_time)
+                else:
+                    self.successes += 1
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+                # Spikes are included in the average, so if responses stay slow the new latency becomes normal
+                if self.latency_average is None:
+                    self.latency_average = latency
+                else:
+                    self.latency_average = 0.9 * self.latency_average + 0.1 * latency
+
+                self.latency_samples += 1
+
+            self.condition.notify_all()
+
+    def is_throttled(self, response: requests.Response) -> bool:
+        """Checks whether a response shows the client is being rate limited.
+
+        Any pause requested by the response is applied to blocked_until.
+
+        Args:
+            response (requests.Response): The response to check.
+
+        Returns:
+            bool: True if the response was throttled.
+        """
+
+        retry_after = response.headers.get("Retry-After")
+
+        if retry_after is not None:
+            try:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + float(retry_after))
+            except ValueError:
+                # Retry-After can also be a HTTP date, which GitHub doesn't send
+                pass
+
+            return True
+
+        # The primary rate limit can be used up by a successful request, and the GraphQL API
+        # reports rate limiting as a 200 with a RATE_LIMITED error
+        if response.headers.get("x-ratelimit-remaining") == "0" or self.is_graphql_rate_limited(response):
+            reset = response.headers.get("x-ratelimit-reset")
+
+            if reset is not None:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + max(0, float(reset) - time.time()))
+
+            return True
+
+        if response.status_code not in (403, 429):
+            return False
+
+        # A 403 without rate limit headers is only throttling if it is a secondary rate limit
+        # Otherwise it is a permissions error which says nothing about load
+        return response.status_code == 429 or "rate limit" in response.text.lower()
+
+    def is_graphql_rate_limited(self, response: requests.Response) -> bool:
+        """Checks whether a GraphQL response contains a RATE_LIMITED error.
+
+        Args:
+            response (requests.Response): The response to check.
+
+        Returns:
+            bool: True if the response contains a RATE_LIMITED error.
+        """
+
+        # Avoid parsing every response body by checking for the error type first
+        if response.status_code != 200 or b"RATE_LIMITED" not in response.content:
+            return False
+
+        try:
+            errors = response.json().get("errors", [])
+        except (ValueError, AttributeError):
+            return False
+
+        return any(error.get("type") == "RATE_LIMITED" for error in errors)
+
+    def decrease(self, start_time: float) -> None:
+        """Multiplies the limit by decrease_factor unless it has already been decreased since the request started.
+
+        Must be called while holding the condition.
+
+        Args:
+            start_time (float): The start time of the request which triggered the decrease.
+        """
+
+        if start_time < self.last_decrease:
+            return
+
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self.last_decrease = time.monotonic()
+
+    def metrics(self) -> dict:
+        """Gets the current state of the limiter.
+
+        Returns:
+            dict: A dictionary containing the current limit, requests in flight, average latency, counts of each outcome and how long new requests are paused for.
+        """
+
+        with self.condition:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "latency_average": self.latency_average,
+                "successes": self.successes,
+                "throttled": self.throttled,
+                "errors": self.errors,
+                "latency_spikes": self.latency_spikes,
+                "paused_for": max(0.0, self.blocked_until - time.monotonic())
+            }
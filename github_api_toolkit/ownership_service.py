@@ -0,0 +1,624 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+import github_api_toolkit
+from github_api_toolkit.cli import read_repository_file
+from github_api_toolkit.webhook_receiver import process_webhook
+
+# GitHub caps webhook payloads at 25 MB, so larger bodies are rejected without being read
+MAX_WEBHOOK_BODY = 25 * 1024 * 1024
+
+
+def codeowners_pattern_to_regex(pattern: str) -> re.Pattern:
+    """Converts a CODEOWNERS file pattern into a regular expression which matches repository paths.
+
+    Follows the rules in GitHub's CODEOWNERS documentation:
+    - A pattern starting with or containing a / is relative to the root of the repository.
+    - A pattern without a / matches at any depth.
+    - A pattern ending in / matches everything within that directory.
+    - A pattern ending in /* matches files directly in that directory but not further nested files.
+    - * matches within a single path segment and ** matches across directories.
+
+    Args:
+        pattern (str): The pattern from the CODEOWNERS file.
+
+    Returns:
+        re.Pattern: The compiled regular expression.
+    """
+
+    anchored = "/" in pattern.rstrip("/")
+    directory = pattern.endswith("/")
+    single_level = pattern.endswith("/*")
+
+    body = pattern.strip("/")
+    regex = ""
+    i = 0
+
+    while i < len(body):
+        if body.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif body.startswith("/**", i) and i + 3 == len(body):
+            regex += "(?:/.*)?"
+            i += 3
+        elif body.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif body[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif body[i] == "?":
+            regex += "[^/]"
+            i += 1
+        else:
+            regex += re.escape(body[i])
+            i += 1
+
+    prefix = "^" if anchored else "^(?:.*/)?"
+
+    if directory:
+        suffix = "/.*$"
+    elif single_level:
+        suffix = "$"
+    else:
+        suffix = "(?:/.*)?$"
+
+    return re.compile(prefix + regex + suffix)
+
+
+def get_codeowners_rules(codeowners_content: str) -> list:
+    """Gets the path rules from a CODEOWNERS file.
+
+    Unlike get_codeowners_from_text(), the pattern each owner belongs to is kept so that the owners of a given path can be found.
+    Emails are ignored. A rule with no owners is kept, as it marks a path as having no owners.
+
+    Args:
+        codeowners_content (str): The contents of a CODEOWNERS file.
+
+    Returns:
+        list: A list of (compiled pattern, owners) tuples in file order.
+    """
+
+    rules = []
+
+    for line in codeowners_content.split("\n"):
+        line = line.strip()
+
+        if "#" in line:
+            line = line[:line.find("#")].strip()
+
+        if line == "":
+            continue
+
+        parts = line.split()
+        owners = [part for part in parts[1:] if part.startswith("@")]
+
+        rules.append((codeowners_pattern_to_regex(parts[0]), owners))
+
+    return rules
+
+
+def match_codeowners_path(rules: list, path: str) -> list:
+    """Gets the owners of a path from a list of CODEOWNERS rules.
+
+    The last matching rule takes precedence, as it does on GitHub.
+
+    Args:
+        rules (list): A list of rules from get_codeowners_rules().
+        path (str): The path within the repository.
+
+    Returns:
+        list: The owners of the path. Empty if no rule matches.
+    """
+
+    path = path.lstrip("/")
+
+    for regex, owners in reversed(rules):
+        if regex.match(path):
+            return owners
+
+    return []
+
+
+def is_not_found(result: tuple) -> bool:
+    """Checks whether a failed lookup means GitHub definitively could not find the team or user.
+
+    Other failures, such as server errors and rate limits, are transient and may succeed next time.
+
+    Args:
+        result (tuple): The (error type, message) or (message, status code) tuple returned instead of a list.
+
+    Returns:
+        bool: True if the team or user does not exist.
+    """
+
+    return isinstance(result, tuple) and ("NOT_FOUND" in result or 404 in result)
+
+
+class ownership_cache():
+    """Keeps the CODEOWNERS, team maintainers and user emails for an organization in memory.
+
+    Entries are fetched using github_graphql_interface the first time they are needed and can be refreshed in the background.
+    Once warm, get_owners() answers from memory without making any requests.
+
+    Repository, team and user names are case-insensitive on GitHub, so they are stored in lowercase.
+    """
+
+    def __init__(self, token: str, org: str, branch: str = "main", timeout: float | tuple = github_api_toolkit.DEFAULT_TIMEOUT) -> None:
+        """Creates an empty cache for an organization.
+
+        Args:
+            token (str): The GitHub access token.
+            org (str): The GitHub organization name.
+            branch (str, optional): The branch to read CODEOWNERS files from. Defaults to "main".
+            timeout (float | tuple, optional): The timeout in seconds for each request. Defaults to DEFAULT_TIMEOUT.
+        """
+
+        self.token = token
+        self.timeout = timeout
+        self.org = org
+        self.branch = branch
+
+        # github_graphql_interface stores query state on the instance, so each thread gets its own.
+        # This means first-time queries never wait behind the background refresh.
+        self.local = threading.local()
+
+        # lowercase repo name -> list of CODEOWNERS rules
+        self.codeowners = {}
+
+        # lowercase team slug -> list of maintainer logins
+        self.team_maintainers = {}
+
+        # lowercase user login -> list of verified domain emails
+        self.user_emails = {}
+
+        # (entries name, key) -> number of times the key has been invalidated
+        # A fetch which started before an invalidation must not store its result, as it may be out of date
+        self.generations = {}
+        self.generations_lock = threading.Lock()
+
+        self.stop_event = threading.Event()
+        self.refresh_thread = None
+
+    def get_interface(self) -> github_api_toolkit.github_graphql_interface:
+        """Gets the github_graphql_interface for the current thread, creating it if needed.
+
+        Returns:
+            github_graphql_interface: The interface for the current thread.
+        """
+
+        if not hasattr(self.local, "ql"):
+            self.local.ql = github_api_toolkit.github_graphql_interface(self.token, timeout=self.timeout)
+
+        return self.local.ql
+
+    def get_generation(self, entries: str, key: str) -> int:
+        """Gets the number of times a key has been invalidated.
+
+        Args:
+            entries (str): The name of the dictionary the key belongs to, such as "codeowners".
+            key (str): The lowercase key.
+
+        Returns:
+            int: The generation of the key.
+        """
+
+        with self.generations_lock:
+            return self.generations.get((entries, key), 0)
+
+    def store(self, entries: str, key: str, generation: int, value: list) -> list:
+        """Stores a fetched value, unless the key was invalidated after the fetch started.
+
+        Args:
+            entries (str): The name of the dictionary to store the value in, such as "codeowners".
+            key (str): The lowercase key.
+            generation (int): The generation of the key when the fetch started, from get_generation().
+            value (list): The fetched value.
+
+        Returns:
+            list: The fetched value.
+        """
+
+        with self.generations_lock:
+            if self.generations.get((entries, key), 0) == generation:
+                getattr(self, entries)[key] = value
+
+        return value
+
+    def invalidate(self, entries: str, key: str) -> None:
+        """Removes a key so it is fetched again when next needed, and stops any fetch in progress from storing it.
+
+        Args:
+            entries (str): The name of the dictionary to remove the key from, such as "codeowners".
+            key (str): The lowercase key.
+        """
+
+        with self.generations_lock:
+            self.generations[(entries, key)] = self.generations.get((entries, key), 0) + 1
+            getattr(self, entries).pop(key, None)
+
+    def refresh_repository(self, repo: str) -> list:
+        """Fetches and parses the CODEOWNERS file of a repository and stores it in the cache.
+
+        If the request fails, any existing entry is kept.
+
+        Args:
+            repo (str): The GitHub repository name.
+
+        Returns:
+            list: The CODEOWNERS rules for the repository.
+        """
+
+        repo = repo.lower()
+        generation = self.get_generation("codeowners", repo)
+
+        ql = self.get_interface()
+
+        path = ql.locate_codeowners_file(self.org, repo, self.branch)
+
+        if path is None:
+            contents = ""
+        else:
+            contents = ql.get_file_contents_from_repo(self.org, repo, path, self.branch)
+
+        if not isinstance(contents, str):
+            # An error message and status code was returned
+            return self.codeowners.get(repo, [])
+
+        return self.store("codeowners", repo, generation, get_codeowners_rules(contents))
+
+    def refresh_team(self, team_name: str) -> list:
+        """Fetches the maintainers of a team and stores them in the cache.
+
+        If GitHub cannot find the team, it is stored with no maintainers so it is not looked up again.
+        If the request fails for any other reason, any existing entry is kept.
+
+        Args:
+            team_name (str): The GitHub team name.
+
+        Returns:
+            list: The logins of the team maintainers.
+        """
+
+        team_name = team_name.lower()
+        generation = self.get_generation("team_maintainers", team_name)
+
+        maintainers = self.get_interface().get_team_maintainers(self.org, team_name)
+
+        if is_not_found(maintainers):
+            maintainers = []
+        elif not isinstance(maintainers, list):
+            return self.team_maintainers.get(team_name, [])
+
+        return self.store("team_maintainers", team_name, generation, [maintainer["login"] for maintainer in maintainers])
+
+    def refresh_user(self, username: str) -> list:
+        """Fetches the verified domain emails of a user and stores them in the cache.
+
+        If GitHub cannot find the user, it is stored with no emails so it is not looked up again.
+        If the request fails for any other reason, any existing entry is kept.
+
+        Args:
+            username (str): The GitHub username.
+
+        Returns:
+            list: The verified domain emails of the user.
+        """
+
+        username = username.lower()
+        generation = self.get_generation("user_emails", username)
+
+        emails = self.get_interface().get_domain_email_by_user(username, self.org)
+
+        if is_not_found(emails):
+            emails = []
+        elif not isinstance(emails, list):
+            return self.user_emails.get(username, [])
+
+        return self.store("user_emails", username, generation, emails)
+
+    def get_owners(self, repo: str, path: str | None = None) -> dict:
+        """Gets the owners, users and emails for a repository or a path within it.
+
+        Anything not already in the cache is fetched before answering.
+
+        Args:
+            repo (str): The GitHub repository name.
+            path (str | None, optional): A path within the repository. Defaults to None (all owners in the CODEOWNERS file).
+
+        Returns:
+            dict: A dictionary containing the repo, path, owners, users and emails.
+        """
+
+        rules = self.codeowners.get(repo.lower())
+
+        if rules is None:
+            rules = self.refresh_repository(repo)
+
+        if path is None:
+            owners = list(dict.fromkeys(owner for _, rule_owners in rules for owner in rule_owners))
+        else:
+            owners = match_codeowners_path(rules, path)
+
+        users = []
+
+        for codeowner in self.get_interface().identify_teams_and_users(list(owners)):
+            if codeowner["type"] == "team":
+                maintainers = self.team_maintainers.get(codeowner["name"].lower())
+
+                if maintainers is None:
+                    maintainers = self.refresh_team(codeowner["name"])
+
+                users.extend(maintainers)
+
+            else:
+                users.append(codeowner["name"])
+
+        users = list(dict.fromkeys(users))
+
+        emails = []
+
+        for user in users:
+            user_emails = self.user_emails.get(user.lower())
+
+            if user_emails is None:
+                user_emails = self.refresh_user(user)
+
+            emails.extend(user_emails)
+
+        return {
+            "repo": repo,
+            "path": path,
+            "owners": owners,
+            "users": users,
+            "emails": list(dict.fromkeys(emails))
+        }
+
+    def invalidate_repository(self, repo: str) -> None:
+        """Removes a repository's CODEOWNERS rules from the cache so they are fetched again when next needed.
+
+        Args:
+            repo (str): The GitHub repository name.
+        """
+
+        self.invalidate("codeowners", repo.lower())
+
+    def invalidate_team(self, team_name: str) -> None:
+        """Removes a team's maintainers from the cache so they are fetched again when next needed.
+
+        Args:
+            team_name (str): The GitHub team name.
+        """
+
+        self.invalidate("team_maintainers", team_name.lower())
+
+    def invalidate_user(self, username: str) -> None:
+        """Removes a user's emails from the cache so they are fetched again when next needed.
+
+        Args:
+            username (str): The GitHub username.
+        """
+
+        self.invalidate("user_emails", username.lower())
+
+    def refresh_all(self) -> None:
+        """Refreshes every repository, team and user currently in the cache.
+
+        If an entry fails to refresh, its existing value is kept and the rest of the pass carries on.
+        """
+
+        entries = [(self.refresh_repository, repo) for repo in list(self.codeowners)]
+        entries += [(self.refresh_team, team_name) for team_name in list(self.team_maintainers)]
+        entries += [(self.refresh_user, username) for username in list(self.user_emails)]
+
+        for refresh, key in entries:
+            try:
+                refresh(key)
+            except Exception as err:
+                print(f"Background refresh of {key} failed: {type(err).__name__}: {err}", file=sys.stderr)
+
+    def start_refresh(self, interval: float) -> threading.Thread:
+        """Starts a background thread which calls refresh_all() every interval seconds.
+
+        Args:
+            interval (float): The time in seconds between refreshes.
+
+        Returns:
+            threading.Thread: The refresh thread.
+        """
+
+        def refresh_loop():
+            while not self.stop_event.wait(interval):
+                try:
+                    self.refresh_all()
+                except Exception as err:
+                    # Keep serving the existing entries and try again next time
+                    print(f"Background refresh failed: {err}", file=sys.stderr)
+
+        self.stop_event.clear()
+        self.refresh_thread = threading.Thread(target=refresh_loop, daemon=True)
+        self.refresh_thread.start()
+
+        return self.refresh_thread
+
+    def stop_refresh(self) -> None:
+        """Stops the background refresh thread."""
+
+        self.stop_event.set()
+
+        if self.refresh_thread:
+            self.refresh_thread.join()
+            self.refresh_thread = None
+
+
+class ownership_request_handler(BaseHTTPRequestHandler):
+    """Answers ownership queries from the ownership_cache attached to the server.
+
+    Endpoints:
+    - GET /owners?repo=<repo>&path=<path> returns the owners of a repository, or of a path within it.
+    - GET /health returns the number of entries in the cache.
+    - POST /webhook invalidates the entries affected by a GitHub webhook event, if the server has a webhook secret.
+    """
+
+    def send_json(self, status: int, body: dict) -> None:
+        """Sends a JSON response.
+
+        Args:
+            status (int): The HTTP status code.
+            body (dict): The response body.
+        """
+
+        content = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        cache = self.server.cache
+
+        if url.path == "/health":
+            self.send_json(200, {
+                "repositories": len(cache.codeowners),
+                "teams": len(cache.team_maintainers),
+                "users": len(cache.user_emails)
+            })
+
+        elif url.path == "/owners":
+            if "repo" not in query:
+                self.send_json(400, {"error": "The repo query parameter is required."})
+                return
+
+            path = query["path"][0] if "path" in query else None
+
+            try:
+                owners = cache.get_owners(query["repo"][0], path)
+            except requests.exceptions.Timeout as errt:
+                # Includes DeadlineExceeded
+                self.send_json(504, {"error": f"GitHub did not respond in time: {errt}"})
+                return
+            except Exception as err:
+                self.send_json(502, {"error": f"Failed to get owners from GitHub: {type(err).__name__}: {err}"})
+                return
+
+            self.send_json(200, owners)
+
+        else:
+            self.send_json(404, {"error": "Not found."})
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path != "/webhook" or not self.server.webhook_secret:
+            self.send_json(404, {"error": "Not found."})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+
+        if length < 0:
+            self.send_json(400, {"error": "The Content-Length header is not valid."})
+            return
+
+        if length > MAX_WEBHOOK_BODY:
+            self.send_json(413, {"error": f"The body is larger than {MAX_WEBHOOK_BODY} bytes."})
+            return
+
+        body = self.rfile.read(length)
+
+        status, response = process_webhook(self.server.cache, self.server.webhook_secret, self.headers, body)
+
+        self.send_json(status, response)
+
+    def log_message(self, format: str, *args) -> None:
+        # Request logging is left to any proxy in front of the service
+        return
+
+
+def make_server(cache: ownership_cache, host: str = "127.0.0.1", port: int = 8080, webhook_secret: str | None = None) -> ThreadingHTTPServer:
+    """Creates a HTTP server which answers ownership queries from a cache.
+
+    Args:
+        cache (ownership_cache): The cache to answer queries from.
+        host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+        port (int, optional): The port to listen on. Defaults to 8080.
+        webhook_secret (str | None, optional): The GitHub webhook secret. If given, POST /webhook invalidates cache entries. Defaults to None.
+
+    Returns:
+        ThreadingHTTPServer: The server. Call serve_forever() to start it.
+    """
+
+    server = ThreadingHTTPServer((host, port), ownership_request_handler)
+    server.cache = cache
+    server.webhook_secret = webhook_secret
+
+    return server
+
+
+def main(argv: list | None = None) -> int:
+    """The entry point for the github-ownership-service command.
+
+    Args:
+        argv (list | None, optional): The command line arguments. Defaults to None (use sys.argv).
+
+    Returns:
+        int: The exit code.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="github-ownership-service",
+        description="Serves CODEOWNERS owners and emails for an organization's repositories from an in-memory cache."
+    )
+
+    parser.add_argument("org", help="The GitHub organization name.")
+    parser.add_argument("--token", default=os.getenv("GITHUB_TOKEN"), help="A GitHub access token. Defaults to the GITHUB_TOKEN environment variable.")
+    parser.add_argument("--host", default="127.0.0.1", help="The address to listen on. Defaults to 127.0.0.1.")
+    parser.add_argument("--port", type=int, default=8080, help="The port to listen on. Defaults to 8080.")
+    parser.add_argument("--branch", default="main", help="The branch to read CODEOWNERS from. Defaults to main.")
+    parser.add_argument("--refresh-interval", type=float, default=900, help="The time in seconds between background refreshes. Defaults to 900.")
+    parser.add_argument("--webhook-secret", default=os.getenv("GITHUB_WEBHOOK_SECRET"), help="The GitHub webhook secret. Enables POST /webhook for cache invalidation. Defaults to the GITHUB_WEBHOOK_SECRET environment variable.")
+    parser.add_argument("--repo-file", help="A file containing one repository name per line to load into the cache at start up.")
+
+    args = parser.parse_args(argv)
+
+    if not args.token:
+        print("A token is required. Use --token or GITHUB_TOKEN.", file=sys.stderr)
+        return 2
+
+    cache = ownership_cache(args.token, args.org, args.branch)
+
+    if args.repo_file:
+        for repo in read_repository_file(args.repo_file):
+            cache.get_owners(repo)
+
+    cache.start_refresh(args.refresh_interval)
+
+    server = make_server(cache, args.host, args.port, args.webhook_secret)
+
+    print(f"Serving on http://{args.host}:{server.server_port}", file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        cache.stop_refresh()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import hashlib
+import hmac
+import json
+import re
+
+# The locations locate_codeowners_file() checks for a CODEOWNERS file
+CODEOWNERS_PATHS = ("CODEOWNERS", ".github/CODEOWNERS", "docs/CODEOWNERS")
+
+# Push webhook payloads list at most 2048 commits, so a push this size may be missing some
+PUSH_COMMIT_LIMIT = 2048
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    """Checks the X-Hub-Signature-256 header of a webhook delivery.
+
+    Args:
+        secret (str): The webhook secret configured on GitHub.
+        body (bytes): The raw request body.
+        signature (str | None): The value of the X-Hub-Signature-256 header.
+
+    Returns:
+        bool: True if the signature matches the body.
+    """
+
+    if not signature:
+        return False
+
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+    return hmac.compare_digest(expected, signature)
+
+
+def get_changed_paths(payload: dict) -> set | None:
+    """Gets every path added, modified or removed by a push.
+
+    Args:
+        payload (dict): The push event payload.
+
+    Returns:
+        set | None: The changed paths, or None if the payload may not list every change.
+    """
+
+    commits = payload.get("commits")
+
+    if commits is None or len(commits) >= PUSH_COMMIT_LIMIT:
+        return None
+
+    # A force push can reset the branch, removing commits which are not listed
+    # A push with no commits that still moves the branch (e.g. a reset to an older commit) is the same
+    if payload.get("forced") or (len(commits) == 0 and payload.get("before") != payload.get("after")):
+        return None
+
+    paths = set()
+
+    for commit in commits:
+        for key in ("added", "modified", "removed"):
+            paths.update(commit.get(key, []))
+
+    return paths
+
+
+def get_team_slug(team_name: str) -> str:
+    """Gets the slug GitHub gives a team from its name.
+
+    Used for renamed teams, as the team event only includes the old name and not the old slug.
+
+    Args:
+        team_name (str): The name of the team.
+
+    Returns:
+        str: The lowercase slug of the team, such as "platform-team" for "Platform Team".
+    """
+
+    return re.sub(r"[^a-z0-9_]+", "-", team_name.lower()).strip("-")
+
+
+def handle_webhook_event(cache, event: str, payload: dict) -> list:
+    """Invalidates the cache entries affected by a GitHub webhook event.
+
+    The cache can be an ownership_cache or any object with org and branch attributes, a team_maintainers dictionary
+    and invalidate_repository(), invalidate_team() and invalidate_user() methods.
+    Names are case-insensitive on GitHub, so the names passed to the invalidate methods are lowercase.
+
+    Handles the following events:
+    - push: the repository, if a CODEOWNERS file on the cached branch changed or the branch was force pushed.
+    - membership: the team a member was added to or removed from.
+    - team: the team which was edited or deleted, and its old slug if it was renamed.
+    - organization: the user who joined or left the organization, and any team they maintain.
+    - repository: the repository which was renamed, transferred or deleted.
+
+    Args:
+        cache: The cache to invalidate entries in.
+        event (str): The value of the X-GitHub-Event header.
+        payload (dict): The event payload.
+
+    Returns:
+        list: A description of each entry invalidated, such as "repository:name".
+    """
+
+    organization = payload.get("organization", {}).get("login")
+
+    if organization is not None and organization.lower() != cache.org.lower():
+        return []
+
+    invalidated = []
+
+    if event == "push":
+        if payload.get("ref") != f"refs/heads/{cache.branch}":
+            return []
+
+        paths = get_changed_paths(payload)
+
+        if paths is None or any(path in CODEOWNERS_PATHS for path in paths):
+            repo = payload["repository"]["name"].lower()
+            cache.invalidate_repository(repo)
+            invalidated.append(f"repository:{repo}")
+
+    elif event == "membership":
+        if payload.get("scope") == "team":
+            team_name = payload["team"]["slug"].lower()
+            cache.invalidate_team(team_name)
+            invalidated.append(f"team:{team_name}")
+
+    elif event == "team":
+        # Changes to a team's repository access do not change its maintainers
+        if payload.get("action") in ("edited", "deleted"):
+            team_name = payload["team"]["slug"].lower()
+            cache.invalidate_team(team_name)
+            invalidated.append(f"team:{team_name}")
+
+        if payload.get("action") == "edited":
+            old_name = payload.get("changes", {}).get("name", {}).get("from")
+
+            if old_name is not None and get_team_slug(old_name) != team_name:
+                old_slug = get_team_slug(old_name)
+                cache.invalidate_team(old_slug)
+                invalidated.append(f"team:{old_slug}")
+
+    elif event == "organization":
+        if payload.get("action") in ("member_added", "member_removed"):
+            username = payload["membership"]["user"]["login"].lower()
+            cache.invalidate_user(username)
+            invalidated.append(f"user:{username}")
+
+            # A user leaving the organization is no longer a maintainer of its teams
+            for team_name, maintainers in list(cache.team_maintainers.items()):
+                if username in [maintainer.lower() for maintainer in maintainers]:
+                    team_name = team_name.lower()
+                    cache.invalidate_team(team_name)
+                    invalidated.append(f"team:{team_name}")
+
+    elif event == "repository":
+        action = payload.get("action")
+        repo = payload["repository"]["name"].lower()
+
+        if action in ("renamed", "transferred", "deleted"):
+            cache.invalidate_repository(repo)
+            invalidated.append(f"repository:{repo}")
+
+        if action == "renamed":
+            old_name = payload.get("changes", {}).get("repository", {}).get("name", {}).get("from")
+
+            if old_name is not None:
+                old_name = old_name.lower()
+                cache.invalidate_repository(old_name)
+                invalidated.append(f"repository:{old_name}")
+
+    return invalidated
+
+
+def process_webhook(cache, secret: str, headers: dict, body: bytes) -> tuple:
+    """Verifies and handles a webhook delivery.
+
+    Args:
+        cache: The cache to invalidate entries in. See handle_webhook_event().
+        secret (str): The webhook secret configured on GitHub.
+        headers (dict): The request headers.
+        body (bytes): The raw request body.
+
+    Returns:
+        tuple: A tuple containing the HTTP status code and a dictionary to send as the response body.
+    """
+
+    if not verify_signature(secret, body, headers.get("X-Hub-Signature-256")):
+        return 401, {"error": "Invalid signature."}
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return 400, {"error": "The body is not valid JSON."}
+
+    event = headers.get("X-GitHub-Event", "")
+
+    try:
+        invalidated = handle_webhook_event(cache, event, payload)
+    except (KeyError, TypeError, AttributeError):
+        return 400, {"error": f"Unexpected payload for {event} event."}
+
+    return 200, {"event": event, "invalidated": invalidated}
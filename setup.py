@@ -9,5 +9,11 @@ setup(
     author_email='kieran.pritchard@ons.gov.uk',
     license='MIT',
     packages=['github_api_toolkit'],
+    entry_points={
+        'console_scripts': [
+            'github-codeowners-sweep=github_api_toolkit.cli:main',
+            'github-ownership-service=github_api_toolkit.ownership_service:main',
+        ],
+    },
     zip_safe=False
 )
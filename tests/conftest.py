@@ -0,0 +1,54 @@
+import pytest
+
+import github_api_toolkit
+from github_api_toolkit import ownership_service
+
+# Shared fixtures for the tests.
+# The github_graphql_interface methods which make API requests are replaced with fakes so that no real API calls are made.
+
+
+class FakeInterface(github_api_toolkit.github_graphql_interface):
+    def __init__(self) -> None:
+        super().__init__("test_token")
+        self.calls = 0
+        self.email_lookups = []
+        self.branches = []
+
+    def locate_codeowners_file(self, owner, repo, branch="main"):
+        self.calls += 1
+        return "CODEOWNERS"
+
+    def get_file_contents_from_repo(self, owner, repo, path, branch="main"):
+        self.calls += 1
+        self.branches.append(branch)
+        return "* @user-a @organisation/team-a\n*.js @user-b"
+
+    def get_team_maintainers(self, org, team_name):
+        self.calls += 1
+        return [{"login": "user-a"}, {"login": "user-c"}]
+
+    def get_domain_email_by_user(self, username, org):
+        self.calls += 1
+        self.email_lookups.append(username)
+        return [f"{username}@example.com"]
+
+
+@pytest.fixture
+def ql() -> FakeInterface:
+    return FakeInterface()
+
+@pytest.fixture
+def cache(ql) -> ownership_service.ownership_cache:
+    cache = ownership_service.ownership_cache("test_token", "organisation")
+    cache.ql = ql
+    cache.get_interface = lambda: cache.ql
+
+    return cache
+
+@pytest.fixture
+def filled_cache(cache) -> ownership_service.ownership_cache:
+    cache.codeowners = {"repo-a": [], "repo-b": []}
+    cache.team_maintainers = {"team-a": ["user-a"], "team-b": ["user-b"]}
+    cache.user_emails = {"user-a": ["user-a@example.com"], "user-b": ["user-b@example.com"]}
+
+    return cache
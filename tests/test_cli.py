@@ -0,0 +1,94 @@
+import json
+
+import github_api_toolkit
+from github_api_toolkit import cli
+
+# This script tests the github-codeowners-sweep command line tool.
+# The github_graphql_interface lookups are replaced with fakes so that no real API calls are made.
+
+
+def fake_get_file_contents_from_repo(self, owner, repo, path, branch="main"):
+    if path != "CODEOWNERS":
+        return "File not found."
+
+    if repo == "repo-c":
+        raise ValueError("Something went wrong")
+
+    if repo == "repo-d":
+        return "* @repo-d @missing-user @organisation/broken-team"
+
+    return f"* @{repo}"
+
+def fake_get_team_maintainers(self, org, team_name):
+    return ("Internal Server Error", 502)
+
+def fake_get_domain_email_by_user(self, username, org):
+    if username == "missing-user":
+        return ("NOT_FOUND", "Could not resolve to a User with the login of 'missing-user'.")
+
+    return [f"{username}@example.com"]
+
+def fake_lookups(monkeypatch):
+    monkeypatch.setattr(github_api_toolkit.github_graphql_interface, "get_file_contents_from_repo", fake_get_file_contents_from_repo)
+    monkeypatch.setattr(github_api_toolkit.github_graphql_interface, "get_team_maintainers", fake_get_team_maintainers)
+    monkeypatch.setattr(github_api_toolkit.github_graphql_interface, "get_domain_email_by_user", fake_get_domain_email_by_user)
+
+
+def test_read_repository_file(tmp_path):
+    repo_file = tmp_path / "repos.txt"
+    repo_file.write_text("repo-a\n\n# A comment\n  repo-b  \n")
+
+    assert cli.read_repository_file(str(repo_file)) == ["repo-a", "repo-b"]
+
+def test_sweep_writes_json_lines_and_checkpoint(tmp_path, monkeypatch):
+    fake_lookups(monkeypatch)
+
+    repo_file = tmp_path / "repos.txt"
+    repo_file.write_text("repo-a\nrepo-b\nrepo-c\n")
+    output = tmp_path / "output.jsonl"
+    checkpoint = tmp_path / "checkpoint.txt"
+
+    exit_code = cli.main(["organisation", "--token", "test_token", "--repo-file", str(repo_file), "--output", str(output), "--checkpoint", str(checkpoint), "--concurrency", "2"])
+
+    records = {record["repo"]: record for record in map(json.loads, output.read_text().splitlines())}
+
+    assert exit_code == 1
+    assert records["repo-a"]["emails"] == ["repo-a@example.com"]
+    assert records["repo-c"]["error"] == "ValueError: Something went wrong"
+    # repo-c failed, so it is left out of the checkpoint to be retried
+    assert cli.read_checkpoint(str(checkpoint)) == {"repo-a", "repo-b"}
+
+def test_sweep_resumes_from_checkpoint(tmp_path, monkeypatch):
+    fake_lookups(monkeypatch)
+
+    repo_file = tmp_path / "repos.txt"
+    repo_file.write_text("repo-a\nrepo-b\n")
+    output = tmp_path / "output.jsonl"
+    checkpoint = tmp_path / "checkpoint.txt"
+    checkpoint.write_text("repo-a\n")
+
+    exit_code = cli.main(["organisation", "--token", "test_token", "--repo-file", str(repo_file), "--output", str(output), "--checkpoint", str(checkpoint)])
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+
+    assert exit_code == 0
+    assert [record["repo"] for record in records] == ["repo-b"]
+
+def test_sweep_records_failed_lookups(tmp_path, monkeypatch):
+    fake_lookups(monkeypatch)
+
+    repo_file = tmp_path / "repos.txt"
+    repo_file.write_text("repo-a\nrepo-d\n")
+    output = tmp_path / "output.jsonl"
+    checkpoint = tmp_path / "checkpoint.txt"
+
+    exit_code = cli.main(["organisation", "--token", "test_token", "--repo-file", str(repo_file), "--output", str(output), "--checkpoint", str(checkpoint)])
+
+    records = {record["repo"]: record for record in map(json.loads, output.read_text().splitlines())}
+
+    assert exit_code == 1
+    # Error messages are not emails
+    assert records["repo-d"]["emails"] == ["repo-d@example.com"]
+    assert "user missing-user: NOT_FOUND" in records["repo-d"]["error"]
+    assert "team broken-team: Internal Server Error 502" in records["repo-d"]["error"]
+    assert cli.read_checkpoint(str(checkpoint)) == {"repo-a"}
@@ -0,0 +1,25 @@
+# This script tests iter_repository_email_list and iter_codeowner_records in the github_graphql_interface class.
+# The ql fixture in conftest.py replaces the methods which make API requests with fakes so that no real API calls are made.
+
+
+def test_records_are_deduplicated(ql):
+    records = list(ql.iter_repository_email_list("organisation", "repository"))
+
+    assert [record["login"] for record in records] == ["user-a", "user-c", "user-b"]
+    assert records[0]["handle"] == "@user-a"
+    assert records[1] == {"handle": "@organisation/team-a", "type": "team", "login": "user-c", "emails": ["user-c@example.com"]}
+    assert ql.email_lookups == ["user-a", "user-c", "user-b"]
+
+def test_records_are_lazy(ql):
+    records = ql.iter_repository_email_list("organisation", "repository")
+
+    assert next(records)["emails"] == ["user-a@example.com"]
+    assert ql.email_lookups == ["user-a"]
+
+def test_matches_get_repository_email_list(ql):
+    emails = [email for record in ql.iter_repository_email_list("organisation", "repository", "develop") for email in record["emails"]]
+
+    assert emails == ql.get_repository_email_list("organisation", "repository", "develop")
+
+    # Both should read CODEOWNERS from the given branch
+    assert ql.branches == ["develop", "develop"]
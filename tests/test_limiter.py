@@ -0,0 +1,162 @@
+import time
+
+import requests
+
+import github_api_toolkit
+
+# This script tests the adaptive_limiter class.
+# Responses are made by hand so that no real API calls are made.
+
+
+def make_response(status_code: int, headers: dict = {}, text: str = "") -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    response._content = text.encode()
+
+    return response
+
+
+def test_limit_grows_while_healthy():
+    limiter = github_api_toolkit.adaptive_limiter(initial_limit=2, max_limit=4)
+
+    for _ in range(20):
+        limiter.release(limiter.acquire(), make_response(200))
+
+    assert limiter.metrics()["limit"] == 4
+
+def test_limit_backs_off_on_secondary_rate_limit():
+    limiter = github_api_toolkit.adaptive_limiter(initial_limit=8)
+
+    limiter.release(limiter.acquire(), make_response(403, text='{"message": "You have exceeded a secondary rate limit."}'))
+
+    assert limiter.metrics()["limit"] == 4
+    assert limiter.metrics()["throttled"] == 1
+
+def test_permission_error_is_not_throttling():
+    limiter = github_api_toolkit.adaptive_limiter(initial_limit=8)
+
+    limiter.release(limiter.acquire(), make_response(403, text='{"message": "Resource not accessible by integration"}'))
+
+    assert limiter.metrics()["throttled"] == 0
+
+def test_retry_after_pauses_requests():
+    limiter = github_api_toolkit.adaptive_limiter(initial_limit=8)
+
+    limiter.release(limiter.acquire(), make_response(429, {"Retry-After": "60"}))
+
+    assert limiter.metrics()["paused_for"] > 50
+
+def test_concurrent_failures_only_back_off_once():
+    limiter = github_api_toolkit.adaptive_limiter(initial_limit=8)
+
+    start_times = [limiter.acquire() for _ in range(4)]
+
+    for start_time in start_times:
+        limiter.release(start_time, make_response(502))
+
+    assert limiter.metrics()["limit"] == 4
+    assert limiter.metrics()["errors"] == 4
+
+def test_failed_request_counts_as_error(monkeypatch):
+    def fake_post(**kwargs):
+        raise requests.exceptions.ConnectionError()
+
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    limiter = github_api_toolkit.adaptive_limiter(initial_limit=8)
+    ql = github_api_toolkit.github_graphql_interface("test_token", limiter=limiter)
+
+    try:
+        ql.make_ql_request("query", {})
+        assert False
+    except requests.exceptions.ConnectionError:
+        pass
+
+    assert limiter.metrics()["errors"] == 1
+    assert limiter.metrics()["in_flight"] == 0
+
+def test_graphql_rate_limit_is_throttling():
+    limiter = github_api_toolkit.adaptive_limiter(initial_limit=8)
+
+    limiter.release(limiter.acquire(), make_response(200, text='{"errors": [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]}'))
+
+    assert limiter.metrics()["throttled"] == 1
+    assert limiter.metrics()["limit"] == 4
+
+def test_exhausted_rate_limit_on_success_pauses_requests():
+    limiter = github_api_toolkit.adaptive_limiter(initial_limit=8)
+
+    limiter.release(limiter.acquire(), make_response(200, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(int(time.time()) + 60)}))
+
+    assert limiter.metrics()["throttled"] == 1
+    assert limiter.metrics()["paused_for"] > 50
+
+def test_latency_level_shift_becomes_normal():
+    limiter = github_api_toolkit.adaptive_limiter(initial_limit=4)
+
+    for _ in range(50):
+        limiter.acquire()
+        limiter.release(time.monotonic() - 0.002, make_response(200))
+
+    # Normal latency rises and stays higher
+    for _ in range(200):
+        limiter.acquire()
+        limiter.release(time.monotonic() - 0.007, make_response(200))
+
+    metrics = limiter.metrics()
+
+    assert metrics["latency_spikes"] < 10
+    assert metrics["latency_average"] > 0.006
+    assert metrics["limit"] > 4
+
+def test_limiter_wait_respects_deadline(monkeypatch):
+    calls = []
+
+    def fake_post(**kwargs):
+        calls.append(kwargs)
+        return make_response(200, text='{"data": {"user": {"organizationVerifiedDomainEmails": []}}}')
+
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    limiter = github_api_toolkit.adaptive_limiter()
+    limiter.blocked_until = time.monotonic() + 2
+
+    ql = github_api_toolkit.github_graphql_interface("test_token", limiter=limiter)
+    ql.deadline = time.monotonic() + 0.2
+
+    start_time = time.monotonic()
+
+    try:
+        ql.get_domain_email_by_user("user-a", "organisation")
+        assert False
+    except github_api_toolkit.DeadlineExceeded:
+        pass
+
+    assert time.monotonic() - start_time < 1
+    assert calls == []
+    assert limiter.metrics()["in_flight"] == 0
+
+def test_deadline_timeout_is_not_an_error(monkeypatch):
+    def fake_post(**kwargs):
+        # Simulate a request which is cut short by the deadline
+        time.sleep(kwargs["timeout"][1])
+        raise requests.exceptions.ReadTimeout()
+
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    limiter = github_api_toolkit.adaptive_limiter(initial_limit=8)
+    ql = github_api_toolkit.github_graphql_interface("test_token", limiter=limiter)
+    ql.deadline = time.monotonic() + 0.05
+
+    try:
+        ql.make_ql_request("query", {})
+        assert False
+    except github_api_toolkit.DeadlineExceeded:
+        pass
+
+    metrics = limiter.metrics()
+
+    assert metrics["errors"] == 0
+    assert metrics["limit"] == 8
+    assert metrics["in_flight"] == 0
@@ -0,0 +1,166 @@
+import json
+import threading
+from http.client import HTTPConnection
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import requests
+
+from github_api_toolkit import ownership_service
+
+# This script tests the ownership service.
+# The cache fixture in conftest.py replaces the github_graphql_interface methods with fakes so that no real API calls are made.
+
+codeowners = """
+# Taken from GitHub's example CODEOWNERS file
+*       @global-owner1 @global-owner2
+*.js    @js-owner #This is an inline comment.
+*.go docs@example.com
+*.txt @octo-org/octocats
+/build/logs/ @doctocat
+docs/*  docs@example.com
+apps/ @octocat
+/docs/ @doctocat
+/scripts/ @doctocat @octocat
+**/logs @octocat
+/apps/ @octocat
+/apps/github
+"""
+
+
+def test_codeowners_path_matching():
+    rules = ownership_service.get_codeowners_rules(codeowners)
+
+    assert ownership_service.match_codeowners_path(rules, "README.md") == ["@global-owner1", "@global-owner2"]
+    assert ownership_service.match_codeowners_path(rules, "src/index.js") == ["@js-owner"]
+    assert ownership_service.match_codeowners_path(rules, "notes/readme.txt") == ["@octo-org/octocats"]
+    assert ownership_service.match_codeowners_path(rules, "docs/getting-started.md") == ["@doctocat"]
+    assert ownership_service.match_codeowners_path(rules, "scripts/deploy.sh") == ["@doctocat", "@octocat"]
+    assert ownership_service.match_codeowners_path(rules, "deeply/nested/logs/output.log") == ["@octocat"]
+    assert ownership_service.match_codeowners_path(rules, "apps/github/main.py") == []
+
+def test_single_level_pattern():
+    rules = ownership_service.get_codeowners_rules("docs/* @user-a")
+
+    assert ownership_service.match_codeowners_path(rules, "docs/getting-started.md") == ["@user-a"]
+    assert ownership_service.match_codeowners_path(rules, "docs/build-app/troubleshooting.md") == []
+
+
+def test_get_owners_uses_warm_cache(cache):
+
+    owners = cache.get_owners("repository")
+    calls = cache.ql.calls
+
+    assert owners["users"] == ["user-a", "user-c", "user-b"]
+    assert owners["emails"] == ["user-a@example.com", "user-c@example.com", "user-b@example.com"]
+
+    # A second lookup, including one for a path, should not make any requests
+    assert cache.get_owners("repository")["emails"] == owners["emails"]
+    assert cache.get_owners("repository", "src/index.js")["emails"] == ["user-b@example.com"]
+    assert cache.ql.calls == calls
+
+def test_http_owners_endpoint(cache):
+    server = ownership_service.make_server(cache, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        with urlopen(f"http://127.0.0.1:{server.server_port}/owners?repo=repository&path=app.js") as response:
+            body = json.loads(response.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert body["owners"] == ["@user-b"]
+    assert body["emails"] == ["user-b@example.com"]
+
+def test_http_owners_endpoint_reports_timeouts(cache):
+
+    def fake_get_team_maintainers(org, team_name):
+        raise requests.exceptions.ReadTimeout("Read timed out.")
+
+    cache.ql.get_team_maintainers = fake_get_team_maintainers
+
+    server = ownership_service.make_server(cache, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        urlopen(f"http://127.0.0.1:{server.server_port}/owners?repo=repository")
+        assert False
+    except HTTPError as err:
+        assert err.code == 504
+        assert "Read timed out." in json.loads(err.read())["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_refresh_all_continues_after_failure(cache):
+    cache.team_maintainers = {"team-a": ["user-a"], "team-b": ["user-b"]}
+
+    def fake_get_team_maintainers(org, team_name):
+        if team_name == "team-a":
+            raise requests.exceptions.ConnectionError()
+
+        return [{"login": "user-c"}]
+
+    cache.ql.get_team_maintainers = fake_get_team_maintainers
+
+    cache.refresh_all()
+
+    assert cache.team_maintainers == {"team-a": ["user-a"], "team-b": ["user-c"]}
+
+def test_missing_user_is_cached(cache):
+
+    def fake_get_domain_email_by_user(username, org):
+        cache.ql.calls += 1
+
+        if username == "user-a":
+            return ("NOT_FOUND", "Could not resolve to a User with the login of 'user-a'.")
+
+        return [f"{username}@example.com"]
+
+    cache.ql.get_domain_email_by_user = fake_get_domain_email_by_user
+
+    assert "user-a@example.com" not in cache.get_owners("repository")["emails"]
+    calls = cache.ql.calls
+
+    # The missing user should not be looked up again
+    cache.get_owners("repository")
+
+    assert cache.user_emails["user-a"] == []
+    assert cache.ql.calls == calls
+
+def test_transient_failure_is_not_cached(cache):
+    cache.user_emails["user-a"] = ["user-a@example.com"]
+
+    cache.ql.get_domain_email_by_user = lambda username, org: ("API rate limit exceeded", 403)
+
+    assert cache.refresh_user("user-a") == ["user-a@example.com"]
+
+    # A user with no existing entry should be looked up again next time
+    assert cache.refresh_user("user-b") == []
+    assert "user-b" not in cache.user_emails
+
+def test_webhook_rejects_invalid_content_length(cache):
+    server = ownership_service.make_server(cache, port=0, webhook_secret="test_secret")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    statuses = []
+
+    try:
+        for length in ("abc", "-1", str(ownership_service.MAX_WEBHOOK_BODY + 1)):
+            connection = HTTPConnection("127.0.0.1", server.server_port)
+            connection.putrequest("POST", "/webhook")
+            connection.putheader("Content-Length", length)
+            connection.endheaders()
+
+            response = connection.getresponse()
+            statuses.append((response.status, "error" in json.loads(response.read())))
+            connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert statuses == [(400, True), (400, True), (413, True)]
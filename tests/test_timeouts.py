@@ -0,0 +1,174 @@
+import time
+
+import requests
+
+import github_api_toolkit
+
+# This script tests the request timeouts and deadline budgets used by the toolkit.
+# requests.get, requests.patch and requests.post are replaced with fakes so that no real API calls are made.
+
+
+class FakeResponse():
+    def __init__(self, json_data: dict, status_code: int = 200) -> None:
+        self.json_data = json_data
+        self.status_code = status_code
+
+    def json(self) -> dict:
+        return self.json_data
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+def test_remaining_timeout_without_deadline():
+    assert github_api_toolkit.get_remaining_timeout((10, 30), None) == (10, 30)
+
+def test_remaining_timeout_is_capped_by_deadline():
+    timeout = github_api_toolkit.get_remaining_timeout((10, 30), time.monotonic() + 5)
+
+    assert all(value <= 5 for value in timeout)
+
+def test_remaining_timeout_after_deadline():
+    try:
+        github_api_toolkit.get_remaining_timeout(30, time.monotonic() - 1)
+        assert False
+    except github_api_toolkit.DeadlineExceeded:
+        pass
+
+def test_ql_request_uses_timeout(monkeypatch):
+    calls = []
+
+    def fake_post(**kwargs):
+        calls.append(kwargs)
+        return FakeResponse({"data": {"user": {"organizationVerifiedDomainEmails": ["a@example.com"]}}})
+
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    ql = github_api_toolkit.github_graphql_interface("test_token", timeout=(2, 4))
+
+    assert ql.get_domain_email_by_user("user-a", "organisation") == ["a@example.com"]
+    assert calls[0]["timeout"] == (2, 4)
+
+def test_repository_email_list_returns_partial_results(monkeypatch):
+    def fake_post(**kwargs):
+        variables = kwargs["json"]["variables"]
+
+        if "repo" in variables:
+            return FakeResponse({"data": {"repository": {"file": {"text": "* @user-a @user-b"}}}})
+
+        if variables["username"] == "user-b":
+            # Simulate a stalled request which uses the rest of the budget
+            ql.deadline = time.monotonic() - 1
+            raise requests.exceptions.ReadTimeout()
+
+        return FakeResponse({"data": {"user": {"organizationVerifiedDomainEmails": ["a@example.com"]}}})
+
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    ql = github_api_toolkit.github_graphql_interface("test_token")
+
+    result = ql.get_repository_email_list("organisation", "repository", deadline=60)
+
+    assert isinstance(result, github_api_toolkit.DeadlineExceeded)
+    assert result.partial == ["a@example.com"]
+    assert ql.deadline is None
+
+def test_repository_email_list_returns_timeout(monkeypatch):
+    def fake_post(**kwargs):
+        raise requests.exceptions.ReadTimeout("Read timed out.")
+
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    ql = github_api_toolkit.github_graphql_interface("test_token")
+
+    result = ql.get_repository_email_list("organisation", "repository")
+
+    assert isinstance(result, requests.exceptions.ReadTimeout)
+    assert not isinstance(result, github_api_toolkit.DeadlineExceeded)
+
+def fake_jwt(monkeypatch):
+    # Skip signing so that a real private key is not needed
+    class FakeJWT():
+        def encode(self, payload, signing_key, alg):
+            return "encoded_jwt"
+
+    monkeypatch.setattr(github_api_toolkit.jwt, "jwk_from_pem", lambda pem: "signing_key")
+    monkeypatch.setattr(github_api_toolkit.jwt, "JWT", FakeJWT)
+
+def test_token_as_installation_uses_timeout(monkeypatch):
+    calls = []
+
+    def fake_get(**kwargs):
+        calls.append(kwargs)
+        return FakeResponse({"id": 1})
+
+    def fake_post(**kwargs):
+        calls.append(kwargs)
+        return FakeResponse({"token": "installation_token", "expires_at": "2024-01-01T00:00:00Z"})
+
+    fake_jwt(monkeypatch)
+    monkeypatch.setattr(requests, "get", fake_get)
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    token = github_api_toolkit.get_token_as_installation("organisation", "pem_contents", "client_id", timeout=(2, 4))
+
+    assert token == ("installation_token", "2024-01-01T00:00:00Z")
+    assert [call["timeout"] for call in calls] == [(2, 4), (2, 4)]
+
+def test_token_as_installation_returns_deadline_exceeded(monkeypatch):
+    posts = []
+    now = [1000.0]
+
+    def fake_get(**kwargs):
+        # Simulate a slow request which uses the rest of the budget
+        now[0] += 10
+        return FakeResponse({"id": 1})
+
+    def fake_post(**kwargs):
+        posts.append(kwargs)
+        return FakeResponse({"token": "installation_token", "expires_at": "2024-01-01T00:00:00Z"})
+
+    fake_jwt(monkeypatch)
+    monkeypatch.setattr(github_api_toolkit.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(requests, "get", fake_get)
+    monkeypatch.setattr(requests, "post", fake_post)
+
+    token = github_api_toolkit.get_token_as_installation("organisation", "pem_contents", "client_id", deadline=5)
+
+    assert isinstance(token, github_api_toolkit.DeadlineExceeded)
+    assert posts == []
+
+def test_rest_requests_use_timeout(monkeypatch):
+    calls = []
+
+    def fake_request(**kwargs):
+        calls.append(kwargs)
+        return requests.Response()
+
+    monkeypatch.setattr(requests.Response, "raise_for_status", lambda self: None)
+
+    for method in ("get", "patch", "post"):
+        monkeypatch.setattr(requests, method, fake_request)
+
+    gh = github_api_toolkit.github_interface("test_token", timeout=(2, 4))
+
+    gh.get("/orgs/organisation")
+    gh.patch("/orgs/organisation")
+    gh.post("/orgs/organisation")
+
+    assert [call["timeout"] for call in calls] == [(2, 4), (2, 4), (2, 4)]
+
+def test_rest_requests_return_timeout(monkeypatch):
+    timeout = requests.exceptions.ReadTimeout("Read timed out.")
+
+    def fake_request(**kwargs):
+        raise timeout
+
+    for method in ("get", "patch", "post"):
+        monkeypatch.setattr(requests, method, fake_request)
+
+    gh = github_api_toolkit.github_interface("test_token")
+
+    assert gh.get("/orgs/organisation") is timeout
+    assert gh.patch("/orgs/organisation") is timeout
+    assert gh.post("/orgs/organisation") is timeout
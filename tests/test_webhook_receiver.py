@@ -0,0 +1,163 @@
+import hashlib
+import hmac
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from github_api_toolkit import ownership_service, webhook_receiver
+
+# This script tests the webhook receiver used to invalidate the ownership service's cache.
+# The cache is filled by hand by the filled_cache fixture in conftest.py so that no real API calls are made.
+
+secret = "test_secret"
+
+
+def sign(body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def test_verify_signature():
+    body = b'{"zen": "Keep it logically awesome."}'
+
+    assert webhook_receiver.verify_signature(secret, body, sign(body))
+    assert not webhook_receiver.verify_signature(secret, body, sign(b"{}"))
+    assert not webhook_receiver.verify_signature(secret, body, None)
+
+def test_push_only_invalidates_when_codeowners_changes(filled_cache):
+    cache = filled_cache
+
+    payload = {
+        "ref": "refs/heads/main",
+        "repository": {"name": "repo-a"},
+        "commits": [{"added": [], "modified": ["README.md"], "removed": []}]
+    }
+
+    assert webhook_receiver.handle_webhook_event(cache, "push", payload) == []
+    assert "repo-a" in cache.codeowners
+
+    payload["commits"].append({"added": [], "modified": [".github/CODEOWNERS"], "removed": []})
+
+    assert webhook_receiver.handle_webhook_event(cache, "push", payload) == ["repository:repo-a"]
+    assert "repo-a" not in cache.codeowners
+    assert "repo-b" in cache.codeowners
+
+def test_push_to_other_branch_is_ignored(filled_cache):
+    cache = filled_cache
+
+    payload = {"ref": "refs/heads/feature", "repository": {"name": "repo-a"}, "commits": [{"modified": ["CODEOWNERS"]}]}
+
+    assert webhook_receiver.handle_webhook_event(cache, "push", payload) == []
+
+def test_member_removed_invalidates_user_and_teams(filled_cache):
+    cache = filled_cache
+
+    payload = {
+        "action": "member_removed",
+        "organization": {"login": "organisation"},
+        "membership": {"user": {"login": "user-a"}}
+    }
+
+    assert webhook_receiver.handle_webhook_event(cache, "organization", payload) == ["user:user-a", "team:team-a"]
+    assert list(cache.user_emails) == ["user-b"]
+    assert list(cache.team_maintainers) == ["team-b"]
+
+def test_event_from_other_organization_is_ignored(filled_cache):
+    cache = filled_cache
+
+    payload = {"action": "deleted", "organization": {"login": "other"}, "team": {"slug": "team-a"}}
+
+    assert webhook_receiver.handle_webhook_event(cache, "team", payload) == []
+    assert "team-a" in cache.team_maintainers
+
+def test_team_event_only_invalidates_maintainer_changes(filled_cache):
+    cache = filled_cache
+
+    payload = {"action": "added_to_repository", "team": {"slug": "team-a"}, "repository": {"name": "repo-a"}}
+
+    assert webhook_receiver.handle_webhook_event(cache, "team", payload) == []
+    assert "team-a" in cache.team_maintainers
+
+    # A renamed team is cached under its old slug
+    payload = {"action": "edited", "team": {"slug": "platform-team"}, "changes": {"name": {"from": "Team A"}}}
+
+    assert webhook_receiver.handle_webhook_event(cache, "team", payload) == ["team:platform-team", "team:team-a"]
+    assert list(cache.team_maintainers) == ["team-b"]
+
+def test_webhook_endpoint(filled_cache):
+    cache = filled_cache
+    server = ownership_service.make_server(cache, port=0, webhook_secret=secret)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    body = json.dumps({"action": "removed", "scope": "team", "team": {"slug": "team-b"}}).encode()
+    url = f"http://127.0.0.1:{server.server_port}/webhook"
+
+    try:
+        try:
+            urlopen(Request(url, data=body, headers={"X-GitHub-Event": "membership", "X-Hub-Signature-256": sign(b"{}")}))
+            assert False
+        except HTTPError as err:
+            assert err.code == 401
+
+        with urlopen(Request(url, data=body, headers={"X-GitHub-Event": "membership", "X-Hub-Signature-256": sign(body)})) as response:
+            response_body = json.loads(response.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert response_body["invalidated"] == ["team:team-b"]
+    assert list(cache.team_maintainers) == ["team-a"]
+
+def test_invalidation_during_refresh_is_not_undone(filled_cache):
+    cache = filled_cache
+
+    def fake_get_file_contents_from_repo(owner, repo, path, branch="main"):
+        # A webhook arrives while the old CODEOWNERS file is being fetched
+        cache.invalidate_repository(repo)
+        return "* @old-owner"
+
+    cache.ql.get_file_contents_from_repo = fake_get_file_contents_from_repo
+
+    cache.refresh_repository("repo-a")
+
+    assert "repo-a" not in cache.codeowners
+
+def test_team_invalidation_ignores_case(filled_cache):
+    cache = filled_cache
+    cache.team_maintainers = {}
+
+    cache.ql.get_team_maintainers = lambda org, team_name: [{"login": "User-A"}]
+
+    # Team names in CODEOWNERS can be in any case, but webhooks give the lowercase slug
+    cache.refresh_team("Platform-Team")
+
+    payload = {"action": "removed", "scope": "team", "team": {"slug": "platform-team"}}
+
+    assert webhook_receiver.handle_webhook_event(cache, "membership", payload) == ["team:platform-team"]
+    assert cache.team_maintainers == {}
+
+    cache.team_maintainers = {"platform-team": ["User-A"]}
+
+    payload = {"action": "member_removed", "membership": {"user": {"login": "user-a"}}}
+
+    assert webhook_receiver.handle_webhook_event(cache, "organization", payload) == ["user:user-a", "team:platform-team"]
+
+def test_force_push_invalidates_repository(filled_cache):
+    cache = filled_cache
+
+    payload = {"ref": "refs/heads/main", "forced": True, "before": "a" * 40, "after": "b" * 40, "repository": {"name": "Repo-A"}, "commits": []}
+
+    assert webhook_receiver.handle_webhook_event(cache, "push", payload) == ["repository:repo-a"]
+    assert "repo-a" not in cache.codeowners
+
+def test_large_push_without_codeowners_change_is_ignored(filled_cache):
+    cache = filled_cache
+
+    payload = {
+        "ref": "refs/heads/main",
+        "repository": {"name": "repo-a"},
+        "commits": [{"added": [], "modified": ["README.md"], "removed": []}] * 25
+    }
+
+    assert webhook_receiver.handle_webhook_event(cache, "push", payload) == []